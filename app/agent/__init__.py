@@ -1,3 +1,4 @@
 from .graph import graph
+from .answer_cache import invoke_cached, get_answer_cache
 
-__all__ = ["graph"]
+__all__ = ["graph", "invoke_cached", "get_answer_cache"]
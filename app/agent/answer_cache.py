@@ -0,0 +1,253 @@
+# app/agent/answer_cache.py
+import os
+import time
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.messages import HumanMessage
+
+from retriever.embeddings import get_embeddings
+from tools.rag_tools import DEFAULT_INDEX, index_version, get_scope
+
+"""
+graph.invoke 앞단의 의미 기반 답변 캐시.
+- 키: 질문 임베딩(코사인 유사도 ≥ 임계값) + 프로필 버킷 + 네임스페이스(인덱스 버전/스코프/use_web)
+- 저장: SQLite (ANSWER_CACHE_PATH, 기본: app/vectorstore/answer_cache.sqlite3)
+- 만료: TTL(ANSWER_CACHE_TTL_S) + 최대 항목 수 초과 시 LRU 삭제
+- 대화 첫 질문(이전 assistant 턴 없음)만 캐시합니다. 이후 턴은 히스토리에 따라 답이 달라지기 때문.
+"""
+
+CACHE_PATH = os.getenv("ANSWER_CACHE_PATH", "app/vectorstore/answer_cache.sqlite3")
+CACHE_ENABLED = os.getenv("ANSWER_CACHE", "1") != "0"
+THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.93"))
+TTL_S = int(os.getenv("ANSWER_CACHE_TTL_S", str(7 * 24 * 3600)))
+MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "5000"))
+QVEC_MEMO_SIZE = 256   # lookup에서 계산한 임베딩을 store에서 재사용하기 위한 LRU 크기
+
+def _normalize(q: str) -> str:
+    return " ".join(unicodedata.normalize("NFKC", q).lower().split())
+
+def profile_bucket(profile: Dict[str, Any]) -> str:
+    """성별 / 나이대(10세) / 체중대(10kg) / 목표 / 질환 목록으로 거친 버킷 키 생성."""
+    age_band = int(profile.get("age", 0)) // 10 * 10
+    weight_band = int(float(profile.get("weight_kg", 0))) // 10 * 10
+    conds = sorted(c.strip().lower() for c in profile.get("conditions", []) if c.strip())
+    return "|".join([
+        str(profile.get("sex", "")).upper()[:1],
+        f"a{age_band}",
+        f"w{weight_band}",
+        str(profile.get("goal", "")),
+        ",".join(conds),
+    ])
+
+def _namespace(use_web: bool) -> str:
+    scope = get_scope()
+    return f"{index_version(DEFAULT_INDEX)}|{scope.get('mode')}:{scope.get('file', '')}|web={int(bool(use_web))}"
+
+class AnswerCache:
+    def __init__(self, path: str = CACHE_PATH, *, threshold: float = THRESHOLD,
+                 ttl_s: int = TTL_S, max_entries: int = MAX_ENTRIES, model_size: str = "small"):
+        self.path = Path(path)
+        self.threshold = threshold
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self.model_size = model_size
+        self._emb = None
+        self._qvec: "OrderedDict[str, np.ndarray]" = OrderedDict()   # 정규화 질문 → 임베딩 (LRU)
+        self._lock = threading.Lock()        # SQLite 연결/통계
+        self._memo_lock = threading.Lock()   # _qvec
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="answer-cache")
+        self._reported: set = set()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS answers (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                namespace TEXT NOT NULL,
+                bucket TEXT NOT NULL,
+                question TEXT NOT NULL,
+                qnorm TEXT NOT NULL,
+                vec BLOB NOT NULL,
+                answer TEXT NOT NULL,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_answers_key ON answers(namespace, bucket)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_answers_lru ON answers(last_used)")
+        self._conn.commit()
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "errors": 0}
+
+    def record_error(self, where: str, err: Exception) -> None:
+        """캐시 장애는 답변을 막지 않되, 통계에 남기고 종류별로 한 번만 출력."""
+        self.stats["errors"] += 1
+        key = (where, type(err).__name__)
+        if key not in self._reported:
+            self._reported.add(key)
+            print(f"[answer_cache] {where} 실패 (이후 같은 오류는 stats['errors']로만 집계): {err!r}")
+
+    def _embed(self, question: str) -> np.ndarray:
+        """질문 임베딩(메모 사용). 네트워크 호출이므로 self._lock 밖에서 호출할 것."""
+        key = _normalize(question)
+        with self._memo_lock:
+            v = self._qvec.get(key)
+            if v is not None:
+                self._qvec.move_to_end(key)
+                return v
+        if self._emb is None:
+            self._emb = get_embeddings(self.model_size)
+        v = np.asarray(self._emb.embed_query(question), dtype=np.float32)
+        v /= (np.linalg.norm(v) or 1.0)
+        with self._memo_lock:
+            self._qvec[key] = v
+            while len(self._qvec) > QVEC_MEMO_SIZE:
+                self._qvec.popitem(last=False)
+        return v
+
+    def _candidates(self, namespace: str, bucket: str) -> List[Tuple[int, str, bytes, str]]:
+        cutoff = time.time() - self.ttl_s
+        return self._conn.execute(
+            "SELECT id, qnorm, vec, answer FROM answers WHERE namespace=? AND bucket=? AND created>=?",
+            (namespace, bucket, cutoff),
+        ).fetchall()
+
+    def _touch(self, row_id: int) -> None:
+        self._conn.execute("UPDATE answers SET last_used=?, hits=hits+1 WHERE id=?", (time.time(), row_id))
+        self._conn.commit()
+
+    def lookup(self, question: str, profile: Dict[str, Any], use_web: bool = False) -> Optional[Dict[str, Any]]:
+        """캐시 적중 시 {"answer", "similarity", "question"} 반환, 아니면 None."""
+        namespace, bucket = _namespace(use_web), profile_bucket(profile)
+        with self._lock:
+            rows = self._candidates(namespace, bucket)
+            if not rows:
+                self.stats["misses"] += 1
+                return None
+            # 1) 정규화 문자열 완전 일치 → 임베딩 호출 없이 반환
+            qnorm = _normalize(question)
+            for row_id, rq, _, ans in rows:
+                if rq == qnorm:
+                    self._touch(row_id)
+                    self.stats["hits"] += 1
+                    return {"answer": ans, "similarity": 1.0, "question": rq}
+        # 2) 임베딩 코사인 유사도 (임베딩 호출 동안 다른 조회를 막지 않도록 락 밖에서)
+        q = self._embed(question)
+        mat = np.stack([np.frombuffer(r[2], dtype=np.float32) for r in rows])
+        sims = mat @ q
+        best = int(np.argmax(sims))
+        with self._lock:
+            if float(sims[best]) < self.threshold:
+                self.stats["misses"] += 1
+                return None
+            row_id, rq, _, ans = rows[best]
+            self._touch(row_id)
+            self.stats["hits"] += 1
+            return {"answer": ans, "similarity": float(sims[best]), "question": rq}
+
+    def store(self, question: str, profile: Dict[str, Any], answer: str, use_web: bool = False) -> None:
+        self._store(question, _namespace(use_web), profile_bucket(profile), answer)
+
+    def store_async(self, question: str, profile: Dict[str, Any], answer: str, use_web: bool = False) -> None:
+        """백그라운드 저장. 키(스코프/인덱스 버전)는 호출 시점 기준으로 고정.
+        키 계산을 포함한 모든 실패는 record_error로만 남기고 호출자에게 전파하지 않습니다.
+        """
+        try:
+            namespace, bucket = _namespace(use_web), profile_bucket(profile)
+        except Exception as err:
+            self.record_error("store", err)
+            return
+
+        def _run() -> None:
+            try:
+                self._store(question, namespace, bucket, answer)
+            except Exception as err:
+                self.record_error("store", err)
+        self._writer.submit(_run)
+
+    def _store(self, question: str, namespace: str, bucket: str, answer: str) -> None:
+        vec = self._embed(question)   # 네트워크 호출은 락 밖에서
+        with self._lock:
+            now = time.time()
+            self._conn.execute(
+                "INSERT INTO answers(namespace, bucket, question, qnorm, vec, answer, created, last_used) "
+                "VALUES (?,?,?,?,?,?,?,?)",
+                (namespace, bucket, question, _normalize(question), vec.tobytes(), answer, now, now),
+            )
+            self._evict(now)
+            self._conn.commit()
+            self.stats["stores"] += 1
+
+    def _evict(self, now: float) -> None:
+        self._conn.execute("DELETE FROM answers WHERE created < ?", (now - self.ttl_s,))
+        (n,) = self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()
+        if n > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM answers WHERE id IN (SELECT id FROM answers ORDER BY last_used ASC LIMIT ?)",
+                (n - self.max_entries,),
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM answers")
+            self._conn.commit()
+
+_CACHE: Optional[AnswerCache] = None
+
+def get_answer_cache() -> AnswerCache:
+    global _CACHE
+    if _CACHE is None:
+        model_size = "small" if "small" in str(DEFAULT_INDEX) else "large"
+        _CACHE = AnswerCache(model_size=model_size)
+    return _CACHE
+
+def _role(m: Any) -> str:
+    if isinstance(m, dict):
+        return m.get("role", "")
+    return {"human": "user", "ai": "assistant"}.get(getattr(m, "type", ""), getattr(m, "type", ""))
+
+def _content(m: Any) -> str:
+    return m.get("content", "") if isinstance(m, dict) else getattr(m, "content", "")
+
+def _cacheable_question(messages: List[Any]) -> Optional[str]:
+    """이전 assistant 턴이 없는 첫 질문이면 그 질문을 반환."""
+    if not messages or _role(messages[-1]) != "user":
+        return None
+    if any(_role(m) == "assistant" for m in messages[:-1]):
+        return None
+    return _content(messages[-1]) or None
+
+def invoke_cached(graph, state: Dict[str, Any], config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """graph.invoke 래퍼. 적중 시 LLM 호출 없이 즉시 반환하며 결과에 'cache' 메타를 붙입니다."""
+    question = _cacheable_question(state.get("messages", [])) if CACHE_ENABLED else None
+    if question is None:
+        return graph.invoke(state, config=config)
+
+    cache = get_answer_cache()
+    profile = state.get("profile", {})
+    use_web = bool(state.get("use_web"))
+    t0 = time.perf_counter()
+    try:
+        hit = cache.lookup(question, profile, use_web)
+    except Exception as err:
+        cache.record_error("lookup", err)   # 캐시 장애가 답변 생성을 막지 않도록
+        hit = None
+    if hit is not None:
+        elapsed_ms = int((time.perf_counter() - t0) * 1000)
+        return {
+            **state,
+            "messages": list(state["messages"]) + [HumanMessage(content=hit["answer"])],
+            "cache": {"hit": True, "similarity": hit["similarity"], "elapsed_ms": elapsed_ms},
+        }
+
+    out = graph.invoke(state, config=config)
+    if out.get("next") != "FINISH":
+        # 미스 응답이 임베딩 호출을 기다리지 않도록 백그라운드에서 저장
+        cache.store_async(question, profile, out["messages"][-1].content, use_web)
+    return {**out, "cache": {"hit": False}}
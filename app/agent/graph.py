@@ -1,55 +1,80 @@
-import os
+import re
 import json
-from typing import Literal, TypedDict
+import operator
+from typing import Annotated, List, Literal, TypedDict
 from langgraph.graph import StateGraph, START, END
 from langgraph.types import Command
 from langgraph.prebuilt import create_react_agent
-from langchain_openai import AzureChatOpenAI
 from langchain_core.messages import HumanMessage
 
+from llm.client import get_chat_llm
 from tools.fitness_tools import estimate_tdee, macro_plan, exercise_picker, contraindication_check
-from tools.rag_tools import search_papers
+from tools.rag_tools import search_papers, prefetch_search
 from tools.web_tools import web_search, corroborate_answer
 
-AOAI_ENDPOINT=os.getenv("AOAI_ENDPOINT")
-AOAI_API_KEY=os.getenv("AOAI_API_KEY")
-AOAI_DEPLOY_GPT4O_MINI=os.getenv("AOAI_DEPLOY_GPT4O_MINI")
-
-llm = AzureChatOpenAI(
-    azure_endpoint = AOAI_ENDPOINT,
-    azure_deployment = AOAI_DEPLOY_GPT4O_MINI,
-    api_version = "2024-10-21",
-    api_key = AOAI_API_KEY
-)
+llm = get_chat_llm()
 
 members = ["workout", "nutrition", "supplement", "qa"]
 
 class State(TypedDict, total=False):  # total=False로 변경
     messages: list
     next: str
+    targets: list                                 # 이번 턴에 실행할 에이전트들
+    answers: Annotated[list, operator.add]        # 병렬 분기 결과 (merge에서 합침)
     profile: dict
     use_web: bool
 
 
 class Router(TypedDict):
-    next: Literal["workout","nutrition","supplement","qa","FINISH"]
+    next: List[Literal["workout","nutrition","supplement","qa","FINISH"]]
 
 system_prompt = (
     "당신은 에이전트 팀의 관리자입니다: " + ", ".join(members) + ". "
-    "사용자 요청을 보고 다음 에이전트를 하나 선택하세요. "
+    "사용자 요청을 보고 담당 에이전트를 고르세요. "
     "운동 계획/주간세트/대체운동→ workout, TDEE/매크로/식단→ nutrition, 보조제→ supplement, 일반 지식문답→ qa. "
-    "사용자가 '고마워/그만/끝/thanks' 등으로 끝내면 FINISH."
+    "한 요청에 여러 주제가 섞여 있으면(예: '하체 4일 루틴 + 감량 매크로') 해당 에이전트를 모두 목록으로 고르세요. "
+    "하나뿐이면 하나만 고르세요. "
+    "사용자가 '고마워/그만/끝/thanks' 등으로 끝내면 [\"FINISH\"]."
 )
 
+SECTION_TITLES = {"workout": "🏋️ 운동", "nutrition": "🥗 영양", "supplement": "💊 보조제", "qa": "📚 Q&A"}
+DISCLAIMER = "\n\n⚠️ 본 정보는 일반적 피트니스 조언이며, 질환/약물/부상은 전문가와 상의하세요."
+
+def _route_targets(raw) -> List[str]:
+    picks = [raw] if isinstance(raw, str) else list(raw or [])
+    targets = [m for m in members if m in picks]   # 중복 제거 + 순서 고정
+    return targets or (["FINISH"] if "FINISH" in picks else ["qa"])
+
+def _last_user_text(messages: list) -> str:
+    for m in reversed(messages):
+        if isinstance(m, dict):
+            if m.get("role") == "user":
+                return m.get("content", "")
+        elif getattr(m, "type", "") == "human":
+            return m.content
+    return ""
+
+# 인사/종료 멘트는 검색으로 이어지지 않으므로 prefetch하지 않음
+_CLOSING = re.compile(r"고마|감사|ㄱㅅ|그만|됐어|끝이|끝낼|수고|안녕|bye|thank|thx", re.IGNORECASE)
+
+def _is_closing(text: str) -> bool:
+    t = text.strip()
+    return len(t) <= 20 and bool(_CLOSING.search(t))
+
 def supervisor_node(state: State) -> Command[Literal[*members, "__end__"]]:
+    # 라우팅 LLM 호출과 겹치도록 마지막 사용자 메시지로 검색을 미리 시작
+    question = _last_user_text(state["messages"])
+    if not _is_closing(question):
+        prefetch_search(question)
     response = llm.with_structured_output(Router).invoke(
         [{"role":"system","content": system_prompt}] + state["messages"]
     )
-    goto = response["next"]
-    if goto == "FINISH":
+    targets = _route_targets(response["next"])
+    if targets == ["FINISH"]:
         followup = llm.invoke(state["messages"])
-        return Command(goto=END, update={"messages":[HumanMessage(content=followup.content)], "next": goto})
-    return Command(goto=goto, update={"next": goto})
+        return Command(goto=END, update={"messages":[HumanMessage(content=followup.content)], "next": "FINISH"})
+    # 여러 대상이면 같은 superstep에서 병렬 분기로 실행됨
+    return Command(goto=targets, update={"next": ",".join(targets), "targets": targets})
 
 # Agents
 workout_agent = create_react_agent(
@@ -82,8 +107,8 @@ qa_prompt = """...
 
 import json
 
-def _agent_step(agent):
-    def _node(state: State):
+def _agent_step(agent, name: str):
+    def _node(state: State) -> Command[Literal["merge", "__end__"]]:
         # 프로필을 system message로 합성
         profile_msg = {
             "role": "system",
@@ -106,15 +131,23 @@ def _agent_step(agent):
 
         result = agent.invoke(augmented_state)
         msg = result["messages"][-1].content
-        msg += "\n\n⚠️ 본 정보는 일반적 피트니스 조언이며, 질환/약물/부상은 전문가와 상의하세요."
-        return Command(update={"messages":[HumanMessage(content=msg)]}, goto=END)
+        if len(state.get("targets") or []) > 1:
+            return Command(update={"answers": [{"agent": name, "content": msg}]}, goto="merge")
+        return Command(update={"messages":[HumanMessage(content=msg + DISCLAIMER)]}, goto=END)
     return _node
 
+def merge_node(state: State):
+    """병렬 분기 답변을 섹션으로 이어붙임 (LLM 호출 없음)."""
+    order = {m: i for i, m in enumerate(members)}
+    parts = sorted(state.get("answers") or [], key=lambda a: order.get(a["agent"], len(order)))
+    body = "\n\n".join(f"### {SECTION_TITLES.get(a['agent'], a['agent'])}\n{a['content']}" for a in parts)
+    return {"messages": [HumanMessage(content=body + DISCLAIMER)]}
+
 
-workout_node    = _agent_step(workout_agent)
-nutrition_node  = _agent_step(nutrition_agent)
-supplement_node = _agent_step(supplement_agent)
-qa_node         = _agent_step(qa_agent)
+workout_node    = _agent_step(workout_agent, "workout")
+nutrition_node  = _agent_step(nutrition_agent, "nutrition")
+supplement_node = _agent_step(supplement_agent, "supplement")
+qa_node         = _agent_step(qa_agent, "qa")
 
 builder = StateGraph(State)
 builder.add_node("supervisor", supervisor_node)
@@ -122,8 +155,10 @@ builder.add_node("workout", workout_node)
 builder.add_node("nutrition", nutrition_node)
 builder.add_node("supplement", supplement_node)
 builder.add_node("qa", qa_node)
+builder.add_node("merge", merge_node)
 
 builder.add_edge(START, "supervisor")
+builder.add_edge("merge", END)
 builder.add_edge("supervisor", END)   # FINISH 시 종료
 
 graph = builder.compile()
@@ -1,23 +1,14 @@
 import sys
 sys.stdout.reconfigure(encoding="utf-8")
 
-import os
 from typing import List
 from langchain_core.documents import Document
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from langchain_openai import AzureChatOpenAI
 
-AOAI_ENDPOINT=os.getenv("AOAI_ENDPOINT")
-AOAI_API_KEY=os.getenv("AOAI_API_KEY")
-AOAI_DEPLOY_GPT4O_MINI=os.getenv("AOAI_DEPLOY_GPT4O_MINI")
+from llm.client import get_chat_llm
 
-llm = AzureChatOpenAI(
-    azure_endpoint = AOAI_ENDPOINT,
-    azure_deployment = AOAI_DEPLOY_GPT4O_MINI,
-    api_version = "2024-10-21",
-    api_key = AOAI_API_KEY
-)
+llm = get_chat_llm()
 
 DEBUG_RETRIEVE = True
 
@@ -37,7 +28,9 @@ PROMPT = ChatPromptTemplate.from_template(
 
 def _format_docs(docs: List[Document]) -> str:
     return "\n\n".join(
-        f"[{i+1}] meta={{'source':{d.metadata.get('source')}, 'page':{d.metadata.get('page')}}}\n{d.page_content}"
+        f"[{i+1}] meta={{'source':{d.metadata.get('source')}, 'page':{d.metadata.get('page')}"
+        + (f", 'rows':{d.metadata['rows']}" if d.metadata.get("rows") else "")
+        + f"}}\n{d.page_content}"
         for i, d in enumerate(docs)
     )
 
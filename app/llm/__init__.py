@@ -0,0 +1,3 @@
+from .client import get_chat_llm, get_http_client, get_metrics, reset_metrics
+
+__all__ = ["get_chat_llm", "get_http_client", "get_metrics", "reset_metrics"]
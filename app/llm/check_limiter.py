@@ -0,0 +1,57 @@
+# app/llm/check_limiter.py
+import sys
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from llm import stub_server
+from llm.client import MAX_CONCURRENCY, API_VERSION, get_http_client, get_metrics
+
+"""
+공유 클라이언트 제한기 점검 스크립트 (스텁 서버 사용, 외부 호출 없음).
+- 429를 섞어 보내는 스텁에 동시 호출을 몰아넣고
+  1) 모든 호출이 재시도 끝에 200으로 끝나는지
+  2) 서버가 관측한 최대 동시 요청 수(본문 전송 완료까지)가 LLM_MAX_CONCURRENCY 이하인지 확인
+실행: (app/ 에서) python -m llm.check_limiter --calls 64 --rate-429 0.3
+실패 시 종료 코드 1.
+"""
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--calls", type=int, default=64)
+    ap.add_argument("--workers", type=int, default=MAX_CONCURRENCY * 4)
+    ap.add_argument("--rate-429", type=float, default=0.3)
+    ap.add_argument("--latency-ms", type=float, default=50)
+    ap.add_argument("--body-delay-ms", type=float, default=30,
+                    help="헤더 후 본문 지연. 본문 수신 중에도 슬롯을 잡고 있는지 확인")
+    ap.add_argument("--port", type=int, default=stub_server.PORT)
+    args = ap.parse_args(argv)
+
+    stub_server.RATE_429 = args.rate_429
+    stub_server.LATENCY_MS = args.latency_ms
+    stub_server.JITTER_MS = args.latency_ms / 2
+    stub_server.RETRY_AFTER_MS = 50
+    stub_server.BODY_DELAY_MS = args.body_delay_ms
+    srv = stub_server.serve(args.port)
+    url = (f"http://127.0.0.1:{args.port}/openai/deployments/stub/chat/completions"
+           f"?api-version={API_VERSION}")
+    client = get_http_client()
+
+    def _call(i: int) -> int:
+        return client.post(url, json={"messages": [{"role": "user", "content": f"q{i}"}]}).status_code
+
+    try:
+        with ThreadPoolExecutor(max_workers=args.workers) as ex:
+            codes = list(ex.map(_call, range(args.calls)))
+    finally:
+        srv.shutdown()
+
+    stats = dict(stub_server._stats)
+    failed = sum(c != 200 for c in codes)
+    ok = failed == 0 and stats["max_in_flight"] <= MAX_CONCURRENCY
+    print(f"[limiter] calls={args.calls} failed={failed} server_max_in_flight={stats['max_in_flight']} "
+          f"limit={MAX_CONCURRENCY} server_429={stats['throttled']} client={get_metrics()} "
+          f"→ {'OK' if ok else 'FAIL'}")
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
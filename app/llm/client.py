@@ -0,0 +1,271 @@
+# app/llm/client.py
+import os
+import json
+import time
+import random
+import threading
+from collections import deque
+from typing import Any, Dict, Optional
+
+import httpx
+from langchain_openai import AzureChatOpenAI
+
+"""
+프로세스 전역에서 공유하는 Azure OpenAI 클라이언트 팩토리.
+- 모든 채팅/임베딩 클라이언트가 하나의 httpx.Client(연결 풀)를 공유
+- 전송 계층(_ThrottledTransport)에서 동시 요청 수와 분당 토큰(TPM) 예산을 전역으로 제한
+- 408/409/429/5xx 응답과 연결 실패/타임아웃은 Retry-After를 존중하며 지터가 있는 지수 백오프로 재시도
+  (SDK 자체 재시도는 끄고 여기서만 재시도)
+- 대기열 대기 시간/재시도 횟수는 get_metrics()로 확인
+
+로컬 테스트: python -m llm.stub_server 실행 후 AOAI_ENDPOINT=http://127.0.0.1:8089
+"""
+
+AOAI_ENDPOINT=os.getenv("AOAI_ENDPOINT")
+AOAI_API_KEY=os.getenv("AOAI_API_KEY")
+AOAI_DEPLOY_GPT4O_MINI=os.getenv("AOAI_DEPLOY_GPT4O_MINI")
+API_VERSION = "2024-10-21"
+
+MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+TPM_BUDGET = int(os.getenv("LLM_TPM", "0"))            # 0 = 제한 없음
+MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "6"))
+BACKOFF_BASE_S = float(os.getenv("LLM_BACKOFF_BASE_S", "0.5"))
+BACKOFF_MAX_S = float(os.getenv("LLM_BACKOFF_MAX_S", "20"))
+POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", str(max(MAX_CONCURRENCY * 2, 10))))
+TIMEOUT_S = float(os.getenv("LLM_TIMEOUT_S", "60"))
+
+# SDK 기본 재시도 대상과 동일(408/409/429/5xx) + 연결 실패/타임아웃
+RETRY_STATUS = {408, 409, 429, 500, 502, 503, 504}
+THROTTLE_STATUS = {429, 503}        # 이 두 개만 스로틀로 보고 모든 호출자를 함께 대기시킴
+RETRY_EXCEPTIONS = (httpx.TimeoutException, httpx.ConnectError)
+
+class _TokenBucket:
+    """분당 토큰 예산. 요청 전 추정 토큰만큼 차감하고, 부족하면 채워질 때까지 대기."""
+    def __init__(self, tpm: int):
+        self.capacity = float(tpm)
+        self.tokens = float(tpm)
+        self.rate = tpm / 60.0
+        self.t = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, n: int) -> None:
+        n = min(float(n), self.capacity)
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.t) * self.rate)
+                self.t = now
+                if self.tokens >= n:
+                    self.tokens -= n
+                    return
+                wait = (n - self.tokens) / self.rate
+            time.sleep(min(wait, 1.0))
+
+class _Metrics:
+    def __init__(self, window: int = 1000):
+        self.lock = threading.Lock()
+        self.waits = deque(maxlen=window)
+        self.reset()
+
+    def reset(self) -> None:
+        with self.lock:
+            self.waits.clear()
+            self.requests = 0
+            self.retries = 0
+            self.throttled = 0
+            self.failures = 0
+            self.in_flight = 0
+            self.queued = 0
+            self.est_tokens = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            w = sorted(self.waits)
+            pct = lambda q: round(w[min(len(w) - 1, int(q * len(w)))] * 1000, 1) if w else 0.0
+            return {
+                "requests": self.requests, "retries": self.retries, "throttled": self.throttled,
+                "failures": self.failures, "in_flight": self.in_flight, "queued": self.queued,
+                "est_tokens": self.est_tokens,
+                "queue_wait_ms": {"p50": pct(0.5), "p95": pct(0.95), "max": pct(1.0)},
+            }
+
+def _estimate_tokens(request: httpx.Request) -> int:
+    """요청 본문 길이 기반 대략적 토큰 추정(≈4 bytes/token) + max_tokens."""
+    body = request.content or b""
+    est = len(body) // 4
+    try:
+        est += int(json.loads(body).get("max_tokens") or 0)
+    except (ValueError, AttributeError, TypeError):
+        pass
+    return max(est, 1)
+
+def _retry_after_s(resp: httpx.Response) -> Optional[float]:
+    ms = resp.headers.get("retry-after-ms")
+    if ms:
+        try:
+            return float(ms) / 1000
+        except ValueError:
+            pass
+    s = resp.headers.get("retry-after")
+    if s:
+        try:
+            return float(s)
+        except ValueError:
+            pass
+    return None
+
+class _Slot:
+    """동시성 슬롯 1개. 응답 본문이 닫힐 때(또는 요청 실패 시) 정확히 한 번 반납."""
+    def __init__(self, sem: threading.BoundedSemaphore, metrics: _Metrics):
+        self.sem = sem
+        self.metrics = metrics
+        self.lock = threading.Lock()
+        self.held = True
+
+    def release(self) -> None:
+        with self.lock:
+            if not self.held:
+                return
+            self.held = False
+        self.sem.release()
+        with self.metrics.lock:
+            self.metrics.in_flight -= 1
+
+class _SlotStream(httpx.SyncByteStream):
+    """httpx는 transport 반환 후(헤더 수신 시점) 본문을 읽으므로, 본문을 다 읽고 닫을 때 슬롯 반납."""
+    def __init__(self, inner: httpx.SyncByteStream, slot: _Slot):
+        self.inner = inner
+        self.slot = slot
+
+    def __iter__(self):
+        yield from self.inner
+
+    def close(self) -> None:
+        try:
+            if hasattr(self.inner, "close"):
+                self.inner.close()
+        finally:
+            self.slot.release()
+
+class _ThrottledTransport(httpx.BaseTransport):
+    def __init__(self, inner: httpx.BaseTransport, *, max_concurrency: int, tpm: int,
+                 max_retries: int, metrics: _Metrics):
+        self.inner = inner
+        self.sem = threading.BoundedSemaphore(max_concurrency)
+        self.bucket = _TokenBucket(tpm) if tpm > 0 else None
+        self.max_retries = max_retries
+        self.metrics = metrics
+        self._pause_until = 0.0      # 429 수신 시 모든 호출자가 함께 대기
+        self._pause_lock = threading.Lock()
+
+    def _wait_pause(self) -> None:
+        delay = self._pause_until - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def _pause(self, seconds: float) -> None:
+        with self._pause_lock:
+            self._pause_until = max(self._pause_until, time.monotonic() + seconds)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        m = self.metrics
+        tokens = _estimate_tokens(request)
+        for attempt in range(self.max_retries + 1):
+            t0 = time.monotonic()
+            with m.lock:
+                m.queued += 1
+            self._wait_pause()
+            if self.bucket is not None:
+                self.bucket.acquire(tokens)
+            self.sem.acquire()
+            slot = _Slot(self.sem, m)
+            with m.lock:
+                m.queued -= 1
+                m.waits.append(time.monotonic() - t0)
+                m.in_flight += 1
+                m.requests += 1
+                m.est_tokens += tokens
+            resp = None
+            try:
+                resp = self.inner.handle_request(request)
+            except RETRY_EXCEPTIONS:
+                if attempt == self.max_retries:
+                    with m.lock:
+                        m.failures += 1
+                    raise
+            except httpx.TransportError:
+                with m.lock:
+                    m.failures += 1
+                raise
+            finally:
+                if resp is None:
+                    slot.release()
+            if resp is not None:
+                # 슬롯은 본문을 다 읽고 응답을 닫을 때 반납 (스트리밍 응답 포함)
+                resp = httpx.Response(resp.status_code, headers=resp.headers,
+                                      stream=_SlotStream(resp.stream, slot), extensions=resp.extensions)
+            if resp is not None and (resp.status_code not in RETRY_STATUS or attempt == self.max_retries):
+                return resp
+            backoff = min(BACKOFF_MAX_S, BACKOFF_BASE_S * (2 ** attempt))
+            delay = random.uniform(0, backoff)   # full jitter
+            throttled = resp is not None and resp.status_code in THROTTLE_STATUS
+            with m.lock:
+                m.retries += 1
+                m.throttled += int(throttled)
+            if resp is not None:
+                try:
+                    resp.read()
+                finally:
+                    resp.close()
+                delay = max(delay, _retry_after_s(resp) or 0.0)
+            if throttled:
+                self._pause(delay)
+            else:
+                time.sleep(delay)
+        return resp
+
+    def close(self) -> None:
+        self.inner.close()
+
+_METRICS = _Metrics()
+_HTTP_CLIENT: Optional[httpx.Client] = None
+_CHAT: Dict[str, AzureChatOpenAI] = {}
+_LOCK = threading.Lock()
+
+def get_http_client() -> httpx.Client:
+    """공유 httpx.Client (연결 풀 + 전역 동시성/TPM 제한 + 재시도)."""
+    global _HTTP_CLIENT
+    with _LOCK:
+        if _HTTP_CLIENT is None:
+            limits = httpx.Limits(max_connections=POOL_SIZE, max_keepalive_connections=POOL_SIZE)
+            transport = _ThrottledTransport(
+                httpx.HTTPTransport(limits=limits),
+                max_concurrency=MAX_CONCURRENCY, tpm=TPM_BUDGET,
+                max_retries=MAX_RETRIES, metrics=_METRICS,
+            )
+            _HTTP_CLIENT = httpx.Client(transport=transport, timeout=TIMEOUT_S)
+        return _HTTP_CLIENT
+
+def get_chat_llm(deployment: Optional[str] = None) -> AzureChatOpenAI:
+    """배포명별로 1개씩 캐시된 AzureChatOpenAI (공유 http client 사용)."""
+    deployment = deployment or AOAI_DEPLOY_GPT4O_MINI
+    with _LOCK:
+        llm = _CHAT.get(deployment)
+    if llm is None:
+        llm = AzureChatOpenAI(
+            azure_endpoint = AOAI_ENDPOINT,
+            azure_deployment = deployment,
+            api_version = API_VERSION,
+            api_key = AOAI_API_KEY,
+            http_client = get_http_client(),
+            max_retries = 0,
+        )
+        with _LOCK:
+            llm = _CHAT.setdefault(deployment, llm)
+    return llm
+
+def get_metrics() -> Dict[str, Any]:
+    return _METRICS.snapshot()
+
+def reset_metrics() -> None:
+    _METRICS.reset()
@@ -0,0 +1,134 @@
+# app/llm/stub_server.py
+import os
+import json
+import time
+import random
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+"""
+Azure OpenAI 호환 로컬 스텁 서버 (지연/429 시뮬레이션용).
+- POST /openai/deployments/{name}/chat/completions
+- POST /openai/deployments/{name}/embeddings
+환경변수: STUB_PORT(8089), STUB_LATENCY_MS(300), STUB_JITTER_MS(100),
+         STUB_429_RATE(0.2), STUB_RETRY_AFTER_MS(500), STUB_EMBED_DIM(1536),
+         STUB_ROUTE(qa; supervisor 라우팅 결과, 쉼표로 여러 개),
+         STUB_BODY_DELAY_MS(0; 헤더 전송 후 본문까지 지연)
+max_in_flight는 본문 전송 직전에 집계를 끝내므로, 클라이언트가 본문을 다 받기 전에
+다음 요청을 보내면(헤더만 받고 슬롯을 놓으면) 한도를 넘는 값으로 드러납니다.
+
+실행: (app/ 에서) python -m llm.stub_server
+"""
+
+PORT = int(os.getenv("STUB_PORT", "8089"))
+LATENCY_MS = float(os.getenv("STUB_LATENCY_MS", "300"))
+JITTER_MS = float(os.getenv("STUB_JITTER_MS", "100"))
+RATE_429 = float(os.getenv("STUB_429_RATE", "0.2"))
+RETRY_AFTER_MS = int(os.getenv("STUB_RETRY_AFTER_MS", "500"))
+EMBED_DIM = int(os.getenv("STUB_EMBED_DIM", "1536"))
+ROUTE = [r for r in os.getenv("STUB_ROUTE", "qa").split(",") if r]
+BODY_DELAY_MS = float(os.getenv("STUB_BODY_DELAY_MS", "0"))
+
+_stats = {"requests": 0, "throttled": 0, "max_in_flight": 0}
+_in_flight = 0
+_lock = threading.Lock()
+
+def _fake_embedding(text: str) -> list:
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+    rng = random.Random(seed)
+    v = [rng.gauss(0, 1) for _ in range(EMBED_DIM)]
+    n = sum(x * x for x in v) ** 0.5 or 1.0
+    return [x / n for x in v]
+
+def _chat_response(body: dict) -> dict:
+    message = {"role": "assistant", "content": "stub answer"}
+    route = json.dumps({"next": ROUTE})                     # supervisor 구조화 출력용
+    choice = body.get("tool_choice")
+    if body.get("response_format"):
+        message["content"] = route
+    elif isinstance(choice, dict) and choice.get("function"):  # function_calling 방식 구조화 출력
+        message = {"role": "assistant", "content": None, "tool_calls": [{
+            "id": "call_stub", "type": "function",
+            "function": {"name": choice["function"]["name"], "arguments": route},
+        }]}
+    return {
+        "id": "chatcmpl-stub", "object": "chat.completion", "created": int(time.time()),
+        "model": body.get("model", "stub"),
+        "choices": [{"index": 0, "finish_reason": "stop", "message": message}],
+        "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+    }
+
+def _embeddings_response(body: dict) -> dict:
+    inputs = body.get("input", [])
+    if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+        inputs = [inputs]
+    data = [{"object": "embedding", "index": i, "embedding": _fake_embedding(str(t))}
+            for i, t in enumerate(inputs)]
+    return {"object": "list", "data": data, "model": body.get("model", "stub"),
+            "usage": {"prompt_tokens": len(inputs), "total_tokens": len(inputs)}}
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _leave(self) -> None:
+        global _in_flight
+        if getattr(self, "_counted", False):
+            self._counted = False
+            with _lock:
+                _in_flight -= 1
+
+    def _send(self, status: int, payload: dict, headers: dict = None) -> None:
+        raw = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        if BODY_DELAY_MS:
+            self.wfile.flush()
+            time.sleep(BODY_DELAY_MS / 1000)
+        self._leave()
+        self.wfile.write(raw)
+
+    def do_GET(self):
+        self._send(200, dict(_stats))
+
+    def do_POST(self):
+        global _in_flight
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        with _lock:
+            _stats["requests"] += 1
+            _in_flight += 1
+            _stats["max_in_flight"] = max(_stats["max_in_flight"], _in_flight)
+        self._counted = True
+        try:
+            time.sleep(max(0.0, LATENCY_MS + random.uniform(-JITTER_MS, JITTER_MS)) / 1000)
+            if random.random() < RATE_429:
+                with _lock:
+                    _stats["throttled"] += 1
+                self._send(429, {"error": {"code": "429", "message": "Rate limit (stub)"}},
+                           {"retry-after-ms": str(RETRY_AFTER_MS)})
+            elif self.path.split("?")[0].endswith("/chat/completions"):
+                self._send(200, _chat_response(body))
+            elif self.path.split("?")[0].endswith("/embeddings"):
+                self._send(200, _embeddings_response(body))
+            else:
+                self._send(404, {"error": {"message": f"unknown path {self.path}"}})
+        finally:
+            self._leave()
+
+def serve(port: int = PORT) -> ThreadingHTTPServer:
+    """백그라운드 스레드로 스텁 서버 기동 후 서버 객체 반환 (shutdown()으로 종료)."""
+    srv = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
+
+if __name__ == "__main__":
+    print(f"stub AOAI on http://127.0.0.1:{PORT} latency={LATENCY_MS}ms 429_rate={RATE_429}")
+    ThreadingHTTPServer(("127.0.0.1", PORT), _Handler).serve_forever()
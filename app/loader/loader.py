@@ -1,8 +1,14 @@
+import os
+import csv
+import json
+import hashlib
+import threading
 from pathlib import Path
-from typing import List
+from typing import Iterator, List, Optional
+
+import numpy as np
 from langchain_core.documents import Document
 from langchain_community.document_loaders import PyPDFLoader
-from langchain_community.document_loaders.csv_loader import CSVLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
 from rapidocr_onnxruntime import RapidOCR
@@ -40,25 +46,124 @@ def detect_pdf_type(pdf_path: Path, text_ratio_threshold=0.1) -> str:
             return "image"
         return "mixed"
 
+# --- OCR ---------------------------------------------------------------------
+# - 엔진은 스레드(워커)마다 1개만 만들어 재사용
+# - 픽스맵 samples를 PNG 인코딩 없이 NumPy 배열(그레이스케일)로 바로 전달
+# - 페이지 크기에 따라 배율을 정해 긴 변이 OCR_TARGET_PX 근처가 되게 렌더링
+# - 결과는 페이지 내용 해시를 키로 디스크(OCR_CACHE_DIR)에 캐시
+
+OCR_CACHE_DIR = Path(os.getenv("OCR_CACHE_DIR", "app/vectorstore/ocr_cache"))
+OCR_TARGET_PX = int(os.getenv("OCR_TARGET_PX", "1800"))
+OCR_MIN_SCALE, OCR_MAX_SCALE = 1.0, 3.0
+_OCR_CACHE_VERSION = "1"
+
+_ocr_local = threading.local()
+
+def _get_ocr() -> RapidOCR:
+    eng = getattr(_ocr_local, "engine", None)
+    if eng is None:
+        eng = _ocr_local.engine = RapidOCR()
+    return eng
+
+def _ocr_scale(page: "fitz.Page") -> float:
+    long_side = max(page.rect.width, page.rect.height) or 1.0
+    return min(OCR_MAX_SCALE, max(OCR_MIN_SCALE, OCR_TARGET_PX / long_side))
+
+def _page_hash(doc: "fitz.Document", page: "fitz.Page", scale: float) -> str:
+    """렌더링 없이 페이지 콘텐츠 스트림 + 이미지 원본 스트림으로 해시 생성."""
+    h = hashlib.sha256()
+    h.update(f"v{_OCR_CACHE_VERSION}|{scale:.3f}|".encode())
+    h.update(page.read_contents() or b"")
+    for img in page.get_images(full=True):
+        h.update(doc.xref_stream_raw(img[0]) or b"")
+    return h.hexdigest()
+
+def _cache_path(key: str) -> Path:
+    return OCR_CACHE_DIR / key[:2] / f"{key}.json"
+
+def _cache_get(key: str) -> Optional[str]:
+    fp = _cache_path(key)
+    try:
+        return json.loads(fp.read_text(encoding="utf-8"))["text"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+def _cache_put(key: str, text: str) -> None:
+    fp = _cache_path(key)
+    fp.parent.mkdir(parents=True, exist_ok=True)
+    tmp = fp.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_text(json.dumps({"text": text}, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, fp)
+
+def _ocr_page(page: "fitz.Page", scale: float) -> str:
+    pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale), colorspace=fitz.csGRAY, alpha=False)
+    # 1채널 그레이스케일: (height, stride) 뷰에서 패딩만 잘라냄 (복사 없음)
+    img = np.frombuffer(pix.samples_mv, dtype=np.uint8).reshape(pix.height, pix.stride)[:, :pix.width]
+    result, _ = _get_ocr()(img)
+    return "\n".join([r[1] for r in result]) if result else ""
+
 def _ocr_pdf_to_documents(pdf_path: Path) -> List[Document]:
-    ocr = RapidOCR()
     docs: List[Document] = []
     with fitz.open(str(pdf_path)) as doc:
         for i, page in enumerate(doc, start=1):
-            mat = fitz.Matrix(2.0, 2.0)
-            pix = page.get_pixmap(matrix=mat, alpha=False)
-            img_bytes = pix.tobytes("png")
-            result, _ = ocr(img_bytes)
-            text = "\n".join([r[1] for r in result]) if result else ""
+            scale = _ocr_scale(page)
+            key = _page_hash(doc, page, scale)
+            text = _cache_get(key)
+            cached = text is not None
+            if not cached:
+                text = _ocr_page(page, scale)
+                try:
+                    _cache_put(key, text)
+                except OSError as e:   # 캐시는 최적화일 뿐이므로 쓰기 실패는 무시
+                    print(f"[ocr] 캐시 저장 실패 ({e}) → 계속 진행")
             docs.append(Document(
                 page_content=text,
-                metadata={"source": str(pdf_path), "page": i, "extracted_via": "rapidocr", "dpi_hint": 144},
+                metadata={
+                    "source": str(pdf_path), "page": i, "extracted_via": "rapidocr",
+                    "dpi_hint": round(72 * scale), "ocr_cached": cached,
+                },
             ))
     return docs
 
-def load_csv(csv_path: Path, encoding: str = "utf-8") -> List[Document]:
-    loader = CSVLoader(file_path=str(csv_path), encoding=encoding)
-    return loader.load()
+def iter_csv_documents(csv_path: Path, chunk_size: int = 1000, encoding: str = "utf-8") -> Iterator[Document]:
+    """CSV를 한 줄씩 스트리밍하며 연속된 행을 chunk_size 근처 크기의 Document로 묶습니다.
+    - 각 문서 앞에 헤더 줄을 붙여 컬럼 맥락 유지
+    - metadata["rows"] = "시작-끝" (헤더 제외 1부터 시작하는 데이터 행 번호)
+    - 메모리는 현재 묶는 중인 문서 1개 분량만 사용
+    """
+    source = str(csv_path)
+    with open(csv_path, newline="", encoding=encoding) as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        head = "columns: " + " | ".join(h.strip() for h in header)
+        buf: List[str] = []
+        size = len(head)
+        start = 1
+
+        def _flush(end: int) -> Document:
+            return Document(
+                page_content=head + "\n" + "\n".join(buf),
+                metadata={"source": source, "page": None, "rows": f"{start}-{end}",
+                          "row_start": start, "row_end": end},
+            )
+
+        row_no = 0
+        for row_no, row in enumerate(reader, start=1):
+            line = " | ".join(v.strip() for v in row)
+            if not line.replace("|", "").strip():
+                continue
+            if buf and size + 1 + len(line) > chunk_size:
+                yield _flush(row_no - 1)
+                buf, size, start = [], len(head), row_no
+            buf.append(line)
+            size += 1 + len(line)
+        if buf:
+            yield _flush(row_no)
+
+def load_csv(csv_path: Path, encoding: str = "utf-8", chunk_size: int = 1000) -> List[Document]:
+    return list(iter_csv_documents(csv_path, chunk_size=chunk_size, encoding=encoding))
 
 def load_and_split_one(path: Path, chunk_size=1000, chunk_overlap=200) -> List[Document]:
     ext = path.suffix.lower()
@@ -73,8 +178,11 @@ def load_and_split_one(path: Path, chunk_size=1000, chunk_overlap=200) -> List[D
         splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
         return splitter.split_documents(pages)
     elif ext == ".csv":
-        rows = load_csv(path)
+        # 행 묶음은 이미 chunk_size 이하 → 한 행이 너무 긴 경우만 분할
         splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
-        return splitter.split_documents(rows)
+        out: List[Document] = []
+        for d in iter_csv_documents(path, chunk_size=chunk_size):
+            out.extend(splitter.split_documents([d]) if len(d.page_content) > chunk_size else [d])
+        return out
     else:
         raise ValueError(f"지원하지 않는 파일 형식: {ext}")
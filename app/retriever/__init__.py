@@ -1,5 +1,6 @@
 from .index import build_faiss, load_faiss
 from .retriever import make_retriever
 from .embeddings import get_embeddings
+from .two_stage import TwoStageFAISS, recall_at_k
 
-__all__ = ["build_faiss", "load_faiss", "make_retriever", "get_embeddings"]
+__all__ = ["build_faiss", "load_faiss", "make_retriever", "get_embeddings", "TwoStageFAISS", "recall_at_k"]
@@ -0,0 +1,172 @@
+import os
+import time
+import shutil
+import hashlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from llm.client import get_metrics
+
+"""
+인덱스 빌드용 동시/재개 가능 배치 임베딩.
+- 배치를 최대 EMBED_CONCURRENCY개 동시에 요청
+- 스로틀링(429) 감지 시 동시성·배치 크기를 절반으로, 연속 성공 시 점진적으로 복구
+- 완료된 배치는 체크포인트 디렉터리에 .npy로 저장 → 중단/실패 후 재실행 시 남은 부분만 임베딩
+- 진행 중 chunks/s, tokens/s(추정) 출력
+"""
+
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "4"))
+EMBED_MAX_ATTEMPTS = int(os.getenv("EMBED_MAX_ATTEMPTS", "5"))
+CKPT_DIRNAME = "_embed_ckpt"
+
+Range = Tuple[int, int]
+
+def _fingerprint(texts: List[str], model_tag: str) -> str:
+    h = hashlib.sha256(model_tag.encode())
+    for t in texts:
+        h.update(b"\x00")
+        h.update(t.encode("utf-8"))
+    return h.hexdigest()[:16]
+
+def _is_throttle(e: Exception) -> bool:
+    status = getattr(e, "status_code", None) or getattr(getattr(e, "response", None), "status_code", None)
+    return status == 429 or type(e).__name__ == "RateLimitError"
+
+def _embed_after(emb, texts: List[str], att: int) -> List[List[float]]:
+    """재시도 배치는 워커 안에서 백오프 후 요청 (스케줄러 루프는 막지 않음)."""
+    if att > 0:
+        time.sleep(min(30.0, 2.0 ** (att - 1)))
+    return emb.embed_documents(texts)
+
+class _Checkpoint:
+    """<persist_dir>/_embed_ckpt/<fingerprint>/<start>_<end>.npy"""
+    def __init__(self, root: Path, fingerprint: str):
+        self.root = root
+        self.dir = root / fingerprint
+        if root.exists():
+            for old in root.iterdir():
+                if old != self.dir:
+                    shutil.rmtree(old, ignore_errors=True)
+        self.dir.mkdir(parents=True, exist_ok=True)
+
+    def load(self, n: int) -> Tuple[Dict[Range, np.ndarray], List[Range]]:
+        done: Dict[Range, np.ndarray] = {}
+        covered = np.zeros(n, dtype=bool)
+        for fp in sorted(self.dir.glob("*.npy")):
+            try:
+                s, e = (int(x) for x in fp.stem.split("_"))
+                arr = np.load(fp)
+            except (ValueError, OSError):
+                continue
+            if e > n or len(arr) != e - s or covered[s:e].any():
+                continue
+            done[(s, e)] = arr
+            covered[s:e] = True
+        missing, i = [], 0
+        while i < n:
+            if covered[i]:
+                i += 1
+                continue
+            j = i
+            while j < n and not covered[j]:
+                j += 1
+            missing.append((i, j))
+            i = j
+        return done, missing
+
+    def save(self, r: Range, arr: np.ndarray) -> None:
+        fp = self.dir / f"{r[0]:09d}_{r[1]:09d}.npy"
+        tmp = fp.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            np.save(f, arr)
+        os.replace(tmp, fp)
+
+def _print_progress(done: int, total: int, chunks_s: float, tokens_s: float, conc: int, batch: int) -> None:
+    print(f"[embed] {done}/{total} chunks · {chunks_s:,.1f} chunks/s · {tokens_s:,.0f} tokens/s "
+          f"· concurrency={conc} batch={batch}", flush=True)
+
+def embed_texts(
+    texts: List[str],
+    emb,
+    checkpoint_dir: Path,
+    *,
+    model_tag: str = "",
+    batch_size: int = EMBED_BATCH_SIZE,
+    concurrency: int = EMBED_CONCURRENCY,
+    max_attempts: int = EMBED_MAX_ATTEMPTS,
+    progress: Optional[Callable[..., None]] = _print_progress,
+    report_every_s: float = 2.0,
+) -> np.ndarray:
+    """texts 전체의 임베딩 행렬(float32, 입력 순서 유지)을 반환합니다.
+    성공 시 체크포인트는 호출자가 인덱스 저장 후 clear_checkpoint()로 지웁니다.
+    """
+    n = len(texts)
+    ckpt = _Checkpoint(Path(checkpoint_dir), _fingerprint(texts, model_tag))
+    done, missing = ckpt.load(n)
+    resumed = sum(e - s for s, e in done)
+    if resumed and progress:
+        print(f"[embed] 체크포인트에서 {resumed}/{n} chunks 재사용", flush=True)
+
+    max_batch, max_conc = max(1, batch_size), max(1, concurrency)
+    cur_batch, cur_conc = max_batch, max_conc
+    # 범위는 나누지 않고 보관했다가 제출 시점의 cur_batch 크기로 잘라 보냄
+    pending: Deque[Tuple[Range, int]] = deque((r, 0) for r in missing)
+    streak = 0
+    completed, tokens = resumed, 0
+    t0 = last_report = time.perf_counter()
+    throttled_seen = get_metrics()["throttled"]
+
+    with ThreadPoolExecutor(max_workers=max_conc) as ex:
+        running = {}
+        while pending or running:
+            while pending and len(running) < cur_conc:
+                (s, e), att = pending.popleft()
+                cut = min(s + cur_batch, e)
+                if cut < e:
+                    pending.appendleft(((cut, e), att))
+                running[ex.submit(_embed_after, emb, texts[s:cut], att)] = ((s, cut), att)
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                (s, e), att = running.pop(fut)
+                try:
+                    arr = np.asarray(fut.result(), dtype=np.float32)
+                except Exception as err:
+                    if att + 1 >= max_attempts:
+                        raise RuntimeError(
+                            f"[embed] 배치 {s}-{e} 실패 ({att + 1}회). 재실행하면 체크포인트에서 이어서 진행합니다."
+                        ) from err
+                    if _is_throttle(err):
+                        cur_conc, cur_batch, streak = max(1, cur_conc // 2), max(1, cur_batch // 2), 0
+                    pending.appendleft(((s, e), att + 1))
+                    continue
+
+                ckpt.save((s, e), arr)
+                done[(s, e)] = arr
+                completed += e - s
+                tokens += sum(len(t) for t in texts[s:e]) // 4
+
+                # 전송 계층에서 재시도된 429도 스로틀 신호로 사용
+                throttled_now = get_metrics()["throttled"]
+                if throttled_now > throttled_seen:
+                    cur_conc, cur_batch, streak = max(1, cur_conc // 2), max(1, cur_batch // 2), 0
+                    throttled_seen = throttled_now
+                else:
+                    streak += 1
+                    if streak >= 2 * cur_conc:
+                        cur_conc, cur_batch, streak = min(max_conc, cur_conc + 1), min(max_batch, cur_batch * 2), 0
+
+            now = time.perf_counter()
+            if progress and (now - last_report >= report_every_s or not (pending or running)):
+                dt = max(now - t0, 1e-9)
+                progress(completed, n, (completed - resumed) / dt, tokens / dt, cur_conc, cur_batch)
+                last_report = now
+
+    return np.concatenate([done[r] for r in sorted(done)]) if done else np.zeros((0, 0), dtype=np.float32)
+
+def clear_checkpoint(checkpoint_dir: Path) -> None:
+    shutil.rmtree(Path(checkpoint_dir), ignore_errors=True)
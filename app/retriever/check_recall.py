@@ -0,0 +1,56 @@
+# app/retriever/check_recall.py
+import sys
+import random
+import argparse
+from pathlib import Path
+from typing import List
+
+from retriever.index import load_faiss
+from retriever.two_stage import TwoStageFAISS, recall_at_k
+
+"""
+실제 two_stage 인덱스의 recall@k 점검 스크립트 (전체 차원 완전 탐색 대비).
+- 쿼리: --queries 파일(한 줄에 하나) 또는 인덱스 청크 본문 일부를 무작위 샘플(--sample)
+- recall@k < 1 - tolerance 이면 종료 코드 1 → 인덱스 재빌드 후 RAG_FIRST_STAGE_DIM 조정 판단용
+쿼리 임베딩은 실제 임베딩 API를 호출합니다(AOAI_* 환경변수 필요).
+실행: (app/ 에서) python -m retriever.check_recall vectorstore/faiss_small --queries q.txt --k 6 --tolerance 0.05
+"""
+
+def _sample_queries(db: TwoStageFAISS, n: int, seed: int = 0) -> List[str]:
+    ids = list(db.index_to_docstore_id.values())
+    rng = random.Random(seed)
+    docs = [db.docstore.search(i) for i in rng.sample(ids, min(n, len(ids)))]
+    return [d.page_content[:300] for d in docs if getattr(d, "page_content", "").strip()]
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("index_dir")
+    ap.add_argument("--queries", help="쿼리 파일(UTF-8, 한 줄에 하나)")
+    ap.add_argument("--sample", type=int, default=50, help="--queries 없을 때 샘플링할 청크 수")
+    ap.add_argument("--k", type=int, default=6)
+    ap.add_argument("--tolerance", type=float, default=0.05)
+    ap.add_argument("--model-size", default=None, help="small | large (기본: 디렉터리 이름으로 추정)")
+    args = ap.parse_args(argv)
+
+    model_size = args.model_size or ("small" if "small" in Path(args.index_dir).name else "large")
+    db = load_faiss(args.index_dir, model_size=model_size)
+    if not isinstance(db, TwoStageFAISS):
+        print(f"[recall] {args.index_dir} 는 two_stage 인덱스가 아닙니다 (RAG_INDEX_MODE=two_stage로 빌드)")
+        return 1
+    if args.queries:
+        queries = [q.strip() for q in Path(args.queries).read_text(encoding="utf-8").splitlines() if q.strip()]
+    else:
+        queries = _sample_queries(db, args.sample)
+    if not queries:
+        print("[recall] 쿼리가 없습니다.")
+        return 1
+
+    res = recall_at_k(db, queries, k=args.k)
+    ok = res["recall_at_k"] >= 1 - args.tolerance
+    print(f"[recall] recall@{args.k}={res['recall_at_k']:.3f} (queries={res['queries']}, "
+          f"기준 ≥ {1 - args.tolerance:.3f}) RAM {res['ram_bytes_per_chunk']}B/청크 "
+          f"vs flat {res['flat_bytes_per_chunk']}B → {'OK' if ok else 'FAIL'}")
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
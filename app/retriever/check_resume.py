@@ -0,0 +1,83 @@
+# app/retriever/check_resume.py
+import sys
+import hashlib
+import tempfile
+import threading
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+from llm import client
+from retriever.batch_embed import embed_texts
+
+"""
+embed_texts 점검 스크립트 (가짜 임베더 사용, 외부 호출 없음).
+1) 재개: 중간에 실패하는 임베더로 한 번 중단시킨 뒤 재실행 →
+   결과가 입력 순서대로 정확하고, 완료된 배치는 다시 임베딩하지 않았는지 확인
+2) 스로틀: 전송 계층 throttled 카운터를 올리는 임베더 → 이후 실제로 더 작은 배치가 전송되는지 확인
+실행: (app/ 에서) python -m retriever.check_resume
+실패 시 종료 코드 1.
+"""
+
+DIM = 8
+
+def _vec(text: str) -> List[float]:
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:4], "big")
+    return np.random.default_rng(seed).standard_normal(DIM).tolist()
+
+class _FakeEmbedder:
+    def __init__(self, fail_after: int = -1, throttle_calls: int = 0):
+        self.fail_after = fail_after          # 이 횟수만큼 성공한 뒤부터 실패
+        self.throttle_calls = throttle_calls  # 앞쪽 호출에서 전송 계층 429 재시도를 흉내
+        self.calls = 0
+        self.sizes: List[int] = []
+        self.embedded = 0
+        self.lock = threading.Lock()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        with self.lock:
+            self.calls += 1
+            call = self.calls
+            self.sizes.append(len(texts))
+            if call <= self.throttle_calls:
+                with client._METRICS.lock:
+                    client._METRICS.throttled += 1
+        if 0 <= self.fail_after < call:
+            raise ConnectionError("fake embedder failure")
+        with self.lock:
+            self.embedded += len(texts)
+        return [_vec(t) for t in texts]
+
+def _check_resume(texts: List[str], expected: np.ndarray, ckpt: Path) -> bool:
+    first = _FakeEmbedder(fail_after=5)
+    try:
+        embed_texts(texts, first, ckpt, batch_size=16, concurrency=1, max_attempts=1, progress=None)
+        print("[resume] 1차 실행이 실패하지 않음")
+        return False
+    except RuntimeError:
+        pass
+    second = _FakeEmbedder()
+    out = embed_texts(texts, second, ckpt, batch_size=16, concurrency=2, progress=None)
+    ok = np.allclose(out, expected) and second.embedded == len(texts) - first.embedded and first.embedded > 0
+    print(f"[resume] 1차 {first.embedded} chunks 완료 후 실패 → 2차 {second.embedded} chunks 임베딩, "
+          f"순서/값 일치={np.allclose(out, expected)} → {'OK' if ok else 'FAIL'}")
+    return ok
+
+def _check_throttle(texts: List[str], expected: np.ndarray, ckpt: Path) -> bool:
+    fake = _FakeEmbedder(throttle_calls=2)
+    out = embed_texts(texts, fake, ckpt, batch_size=32, concurrency=1, progress=None)
+    ok = np.allclose(out, expected) and fake.sizes[0] == 32 and min(fake.sizes[2:] or [32]) < 32
+    print(f"[throttle] 전송된 배치 크기={fake.sizes} → {'OK' if ok else 'FAIL'}")
+    return ok
+
+def main() -> int:
+    texts = [f"chunk {i}" for i in range(200)]
+    expected = np.asarray([_vec(t) for t in texts], dtype=np.float32)
+    with tempfile.TemporaryDirectory() as tmp:
+        ok = _check_resume(texts, expected, Path(tmp) / "resume")
+        ok = _check_throttle(texts, expected, Path(tmp) / "throttle") and ok
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
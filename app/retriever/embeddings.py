@@ -1,18 +1,32 @@
 import os
+import threading
+from typing import Dict
 from langchain_openai import AzureOpenAIEmbeddings
 
+from llm.client import get_http_client, API_VERSION
+
 AOAI_ENDPOINT=os.getenv("AOAI_ENDPOINT")
 AOAI_API_KEY=os.getenv("AOAI_API_KEY")
 small_model = os.getenv("AOAI_DEPLOY_EMBED_3_SMALL")
 large_model = os.getenv("AOAI_DEPLOY_EMBED_3_LARGE")
 
+_CACHE: Dict[str, AzureOpenAIEmbeddings] = {}
+_LOCK = threading.Lock()
+
 def get_embeddings(model_size: str = "small") -> AzureOpenAIEmbeddings:
+    """모델 크기별로 1개씩 캐시된 임베딩 클라이언트 (공유 http client/동시성 제한 사용)."""
     model = small_model if model_size != "large" else large_model
     if not model:
         raise ValueError(f"[embeddings] 환경변수에 {model_size} 임베딩 배포명이 없습니다.")
-    return AzureOpenAIEmbeddings(
-        model=model,
-        api_key=AOAI_API_KEY,
-        azure_endpoint=AOAI_ENDPOINT,
-        api_version="2024-10-21"
-    )
+    with _LOCK:
+        emb = _CACHE.get(model)
+        if emb is None:
+            emb = _CACHE[model] = AzureOpenAIEmbeddings(
+                model=model,
+                api_key=AOAI_API_KEY,
+                azure_endpoint=AOAI_ENDPOINT,
+                api_version=API_VERSION,
+                http_client=get_http_client(),
+                max_retries=0,
+            )
+        return emb
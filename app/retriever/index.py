@@ -1,12 +1,17 @@
+import os
 from pathlib import Path
 from typing import List
 from langchain_core.documents import Document
 from langchain_community.vectorstores import FAISS
 from .embeddings import get_embeddings
+from .batch_embed import embed_texts, clear_checkpoint, CKPT_DIRNAME
+from .two_stage import build_two_stage, is_two_stage, load_two_stage, META_FILE, FULL_FILE
 
 PERSIST_DIR = "vectorstore"
+INDEX_MODE = os.getenv("RAG_INDEX_MODE", "flat").lower()   # flat | two_stage
 
-def build_faiss(chunks: List[Document], persist_dir: str = PERSIST_DIR, model_size: str = "small") -> FAISS:
+def build_faiss(chunks: List[Document], persist_dir: str = PERSIST_DIR, model_size: str = "small",
+                mode: str = INDEX_MODE) -> FAISS:
     chunks = [c for c in chunks if c.page_content and c.page_content.strip()]
     if not chunks:
         raise ValueError("[build_faiss] 저장할 청크가 없습니다.")
@@ -15,11 +20,22 @@ def build_faiss(chunks: List[Document], persist_dir: str = PERSIST_DIR, model_si
     texts = [d.page_content for d in chunks]
     metas = [d.metadata for d in chunks]
     emb = get_embeddings(model_size)
-    db = FAISS.from_texts(texts=texts, embedding=emb, metadatas=metas)
-    db.save_local(str(p))
+    ckpt = p / CKPT_DIRNAME
+    vectors = embed_texts(texts, emb, ckpt, model_tag=model_size)
+    if mode == "two_stage":
+        db = build_two_stage(texts, vectors, metas, emb, p)
+    else:
+        db = FAISS.from_embeddings(text_embeddings=list(zip(texts, vectors.tolist())), embedding=emb, metadatas=metas)
+        db.save_local(str(p))
+        # 이전 two_stage 빌드의 잔여 파일이 load 시 오인되지 않도록 제거
+        for name in (META_FILE, FULL_FILE):
+            (p / name).unlink(missing_ok=True)
+    clear_checkpoint(ckpt)
     return db
 
 def load_faiss(persist_dir: str = PERSIST_DIR, model_size: str = "small") -> FAISS:
     p = Path(persist_dir).resolve()
     emb = get_embeddings(model_size)
+    if is_two_stage(p):
+        return load_two_stage(p, emb)
     return FAISS.load_local(str(p), emb, allow_dangerous_deserialization=True)
@@ -0,0 +1,162 @@
+import os
+import json
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import faiss
+from langchain_core.documents import Document
+from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import maximal_marginal_relevance
+
+"""
+2단계 검색 인덱스 (RAG_INDEX_MODE=two_stage).
+- 1단계: 앞쪽 RAG_FIRST_STAGE_DIM 차원만 잘라 재정규화한 벡터를 메모리 FAISS(기본 fp16 양자화)로 검색
+- 2단계: 상위 후보만 디스크의 전체 차원 벡터(full_vectors.npy, memmap)로 정확 L2 재계산
+text-embedding-3 계열은 앞쪽 차원만 잘라도 의미가 유지되도록 학습되어 있어 절단이 유효합니다.
+3072차원 float32(12KB/청크) → 768차원 fp16(1.5KB/청크)이면 RAM 약 8배 절감.
+절단에 따른 recall 손실은 코퍼스마다 다르므로 빌드 후 python -m retriever.check_recall 로 확인하세요.
+load_faiss가 메타 파일을 보고 자동으로 이 클래스를 쓰므로 search_papers/make_retriever는 그대로 동작합니다.
+"""
+
+META_FILE = "two_stage.json"
+FULL_FILE = "full_vectors.npy"
+FIRST_STAGE_DIM = int(os.getenv("RAG_FIRST_STAGE_DIM", "768"))
+FIRST_STAGE_QUANT = os.getenv("RAG_FIRST_STAGE_QUANT", "fp16").lower()   # fp16 | none
+RESCORE_FACTOR = int(os.getenv("RAG_RESCORE_FACTOR", "8"))
+
+def _truncate(x: np.ndarray, dim: int) -> np.ndarray:
+    t = np.ascontiguousarray(x[..., :dim], dtype=np.float32)
+    norms = np.linalg.norm(t, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return t / norms
+
+def _make_filter(flt: Any) -> Optional[Callable[[Dict[str, Any]], bool]]:
+    if flt is None:
+        return None
+    if callable(flt):
+        return flt
+    def _match(md: Dict[str, Any]) -> bool:
+        return all(md.get(k) in v if isinstance(v, list) else md.get(k) == v for k, v in flt.items())
+    return _match
+
+def _first_stage_index(vectors: np.ndarray, quant: str) -> "faiss.Index":
+    dim = vectors.shape[1]
+    if quant == "fp16":
+        index = faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_L2)
+        if not index.is_trained:
+            index.train(vectors)
+    else:
+        index = faiss.IndexFlatL2(dim)
+    index.add(vectors)
+    return index
+
+class TwoStageFAISS(FAISS):
+    """FAISS 래퍼: by_vector 검색 두 곳만 재정의해 similarity/score/mmr/retriever가 모두 2단계를 타게 함."""
+    _full: np.ndarray
+    _dim: int
+
+    def _attach(self, full: np.ndarray, dim: int) -> "TwoStageFAISS":
+        self._full, self._dim = full, dim
+        return self
+
+    def _search_ids(self, embedding: List[float], n: int) -> Tuple[np.ndarray, np.ndarray]:
+        """1단계 후보 n개 → 전체 차원 L2²로 재정렬한 (ids, dists)."""
+        q = np.asarray(embedding, dtype=np.float32)
+        _, idx = self.index.search(_truncate(q, self._dim)[None, :], min(n, self.index.ntotal))
+        ids = idx[0][idx[0] >= 0]
+        if ids.size == 0:
+            return ids, np.zeros(0, dtype=np.float32)
+        ids = np.sort(ids)                           # memmap은 정렬된 인덱스로 읽는 편이 빠름
+        full = np.asarray(self._full[ids], dtype=np.float32)
+        d = ((full - q) ** 2).sum(axis=1)
+        rank = np.argsort(d, kind="stable")
+        return ids[rank], d[rank]
+
+    def _docs_for(self, ids: np.ndarray, dists: np.ndarray, k: int, flt: Any,
+                  score_threshold: Optional[float] = None) -> List[Tuple[Document, float, int]]:
+        match = _make_filter(flt)
+        out = []
+        for i, d in zip(ids, dists):
+            if score_threshold is not None and d > score_threshold:
+                break
+            doc = self.docstore.search(self.index_to_docstore_id[int(i)])
+            if not isinstance(doc, Document):
+                continue
+            if match is not None and not match(doc.metadata):
+                continue
+            out.append((doc, float(d), int(i)))
+            if len(out) >= k:
+                break
+        return out
+
+    def similarity_search_with_score_by_vector(self, embedding: List[float], k: int = 4,
+                                               filter: Any = None, fetch_k: int = 20,
+                                               **kwargs: Any) -> List[Tuple[Document, float]]:
+        n = max(k * RESCORE_FACTOR, fetch_k if filter is not None else 0)
+        ids, dists = self._search_ids(embedding, n)
+        hits = self._docs_for(ids, dists, k, filter, kwargs.get("score_threshold"))
+        return [(doc, d) for doc, d, _ in hits]
+
+    def max_marginal_relevance_search_with_score_by_vector(self, embedding: List[float], *, k: int = 4,
+                                                            fetch_k: int = 20, lambda_mult: float = 0.5,
+                                                            filter: Any = None) -> List[Tuple[Document, float]]:
+        n = max(fetch_k * (2 if filter is not None else 1), k * RESCORE_FACTOR)
+        ids, dists = self._search_ids(embedding, n)
+        hits = self._docs_for(ids, dists, fetch_k, filter)
+        if not hits:
+            return []
+        cand = np.asarray(self._full[np.array([i for _, _, i in hits])], dtype=np.float32)
+        picked = maximal_marginal_relevance(
+            np.array([embedding], dtype=np.float32), list(cand), k=k, lambda_mult=lambda_mult
+        )
+        return [(hits[j][0], hits[j][1]) for j in picked]
+
+def build_two_stage(texts: List[str], vectors: np.ndarray, metas: List[dict], emb, persist_dir: Path,
+                    *, dim: int = FIRST_STAGE_DIM, quant: str = FIRST_STAGE_QUANT) -> TwoStageFAISS:
+    p = Path(persist_dir)
+    dim = min(dim, vectors.shape[1])
+    low = _truncate(vectors, dim)
+    db = TwoStageFAISS.from_embeddings(text_embeddings=list(zip(texts, low.tolist())), embedding=emb, metadatas=metas)
+    db.index = _first_stage_index(low, quant)
+    db.save_local(str(p))
+    full = np.lib.format.open_memmap(p / FULL_FILE, mode="w+", dtype=np.float32, shape=vectors.shape)
+    full[:] = vectors
+    full.flush()
+    del full
+    (p / META_FILE).write_text(json.dumps({
+        "dim": dim, "full_dim": int(vectors.shape[1]), "quant": quant, "count": int(vectors.shape[0]),
+    }), encoding="utf-8")
+    return db._attach(np.load(p / FULL_FILE, mmap_mode="r"), dim)
+
+def is_two_stage(persist_dir: Path) -> bool:
+    p = Path(persist_dir)
+    return (p / META_FILE).exists() and (p / FULL_FILE).exists()
+
+def load_two_stage(persist_dir: Path, emb) -> TwoStageFAISS:
+    p = Path(persist_dir)
+    meta = json.loads((p / META_FILE).read_text(encoding="utf-8"))
+    db = TwoStageFAISS.load_local(str(p), emb, allow_dangerous_deserialization=True)
+    return db._attach(np.load(p / FULL_FILE, mmap_mode="r"), int(meta["dim"]))
+
+def recall_at_k(db: TwoStageFAISS, queries: List[str], k: int = 6, block: int = 65536) -> Dict[str, Any]:
+    """전체 차원 완전 탐색 대비 2단계 검색의 recall@k와 청크당 RAM 바이트를 측정."""
+    full = db._full
+    hits = 0
+    for q in queries:
+        e = np.asarray(db._embed_query(q), dtype=np.float32)
+        best_d = np.full(0, np.inf, dtype=np.float32)
+        best_i = np.zeros(0, dtype=np.int64)
+        for s in range(0, full.shape[0], block):
+            d = ((np.asarray(full[s:s + block], dtype=np.float32) - e) ** 2).sum(axis=1)
+            best_d = np.concatenate([best_d, d])
+            best_i = np.concatenate([best_i, np.arange(s, s + len(d))])
+            keep = np.argsort(best_d, kind="stable")[:k]
+            best_d, best_i = best_d[keep], best_i[keep]
+        approx, _ = db._search_ids(e.tolist(), k * RESCORE_FACTOR)
+        hits += len(set(best_i.tolist()) & set(approx[:k].tolist()))
+    ram = db.index.sa_code_size() if hasattr(db.index, "sa_code_size") else db._dim * 4
+    return {
+        "recall_at_k": hits / max(1, len(queries) * k), "k": k, "queries": len(queries),
+        "ram_bytes_per_chunk": int(ram), "flat_bytes_per_chunk": int(full.shape[1] * 4),
+    }
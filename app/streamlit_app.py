@@ -12,7 +12,7 @@ if str(APP_DIR) not in sys.path:
     sys.path.insert(0, str(APP_DIR))
 # --------------------------------------------------------------------------------------------
 
-from agent import graph
+from agent import graph, invoke_cached
 from loader import list_supported_files, load_and_split_one
 from retriever import build_faiss
 from tools.rag_tools import set_scope, corpus_info  
@@ -135,9 +135,12 @@ if user_msg:
         "use_web": use_web,
     }
     try:
-        out = graph.invoke(state, config={"recursion_limit": 50})
+        out = invoke_cached(graph, state, config={"recursion_limit": 50})
         assistant_msg = out["messages"][-1].content
         st.session_state.history.append({"role": "assistant", "content": assistant_msg})
+        cache_meta = out.get("cache") or {}
+        if cache_meta.get("hit"):
+            st.caption(f"⚡ 캐시된 답변 · similarity={cache_meta['similarity']:.3f} · {cache_meta['elapsed_ms']}ms")
 
         # 🔎 웹 교차 검증: UI에서 use_web 켜졌을 때만 실행
         if use_web:
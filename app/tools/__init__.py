@@ -1,8 +1,10 @@
 from .fitness_tools import estimate_tdee, macro_plan, exercise_picker, contraindication_check
+from .fitness_plan import bulk_plan
 from .rag_tools import search_papers
 from .web_tools import web_search, corroborate_answer
 
 __all__ = [
     "estimate_tdee", "macro_plan", "exercise_picker", "contraindication_check",
     "search_papers", "web_search", "corroborate_answer",
+    "bulk_plan",
 ]
@@ -0,0 +1,165 @@
+# app/tools/fitness_plan.py
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Union
+
+import numpy as np
+import pandas as pd
+
+"""
+다수 프로필의 BMR/TDEE/매크로를 NumPy/pandas 벡터 연산으로 일괄 계산합니다.
+- estimate_tdee / macro_plan 도구는 이 모듈의 함수를 1행 배치로 호출하는 얇은 래퍼입니다.
+- 입력: CSV 경로 또는 dict 리스트(또는 DataFrame)
+"""
+
+ACTIVITY_MULT = {"sedentary": 1.2, "light": 1.375, "moderate": 1.55, "high": 1.725}
+GOAL_ADJ = {"cut": -0.2, "recomp": 0.0, "bulk": 0.1}
+DEFAULT_ACTIVITY_MULT = 1.55
+DEFAULT_GOAL_ADJ = 0.0
+
+OUTPUT_COLUMNS = ("bmr", "tdee", "kcal", "protein_g", "fat_g", "carbs_g", "error")
+
+Profiles = Union[str, Path, pd.DataFrame, Iterable[Dict[str, Any]]]
+
+def to_frame(profiles: Profiles) -> pd.DataFrame:
+    """CSV 경로(또는 파일 객체) / dict 리스트 / DataFrame을 컬럼형 DataFrame으로 변환."""
+    if isinstance(profiles, pd.DataFrame):
+        return profiles.reset_index(drop=True)
+    if isinstance(profiles, (str, Path)) or hasattr(profiles, "read"):
+        return pd.read_csv(profiles)
+    return pd.DataFrame(list(profiles))
+
+def _column(df: pd.DataFrame, name: str, default: Any) -> pd.Series:
+    if name not in df.columns:
+        return pd.Series(default, index=df.index)
+    return df[name].fillna(default)
+
+def _numbers(df: pd.DataFrame, name: str) -> np.ndarray:
+    """숫자 컬럼 → float64 배열. 누락/숫자가 아닌 값은 NaN."""
+    if name not in df.columns:
+        return np.full(len(df), np.nan)
+    col = pd.to_numeric(df[name], errors="coerce")
+    return col.astype("Float64").to_numpy(dtype=np.float64, na_value=np.nan)
+
+def _errors(df: pd.DataFrame, bad: Dict[str, np.ndarray]) -> pd.Series:
+    """행별 오류 메시지 (정상 행은 None)."""
+    msgs = [[] for _ in range(len(df))]
+    for name, mask in bad.items():
+        for i in np.flatnonzero(mask):
+            msgs[i].append(name)
+    return pd.Series([f"missing/invalid: {', '.join(m)}" if m else None for m in msgs],
+                     index=df.index, dtype=object)
+
+def _nullable_int(values: np.ndarray, valid: np.ndarray) -> pd.arrays.IntegerArray:
+    # NaN을 int64로 캐스팅하지 않도록 무효 행은 NA로 남김
+    return pd.arrays.IntegerArray(np.where(valid, values, 0).astype(np.int64), mask=~valid)
+
+def compute_tdee(df: pd.DataFrame) -> pd.DataFrame:
+    """Mifflin–St Jeor BMR과 활동계수 TDEE (컬럼: sex, age, height_cm, weight_kg, activity?).
+    필수 값이 없거나 숫자가 아닌 행은 bmr/tdee가 NA이고 error 컬럼에 사유가 들어갑니다.
+    """
+    w, h, a = _numbers(df, "weight_kg"), _numbers(df, "height_cm"), _numbers(df, "age")
+    sex = df["sex"] if "sex" in df.columns else pd.Series(np.nan, index=df.index)
+    sex_ok = sex.map(lambda v: isinstance(v, str) and bool(v.strip())).to_numpy(dtype=bool)
+    male = sex.where(sex_ok, "").astype(str).str.upper().str.startswith("M").to_numpy()
+    bad = {"sex": ~sex_ok, "age": np.isnan(a), "height_cm": np.isnan(h), "weight_kg": np.isnan(w)}
+    valid = ~np.logical_or.reduce(list(bad.values()))
+
+    bmr = 10*w + 6.25*h - 5*a + np.where(male, 5, -161)
+    mult = (
+        _column(df, "activity", "moderate")
+        .map(ACTIVITY_MULT).fillna(DEFAULT_ACTIVITY_MULT)
+        .to_numpy(dtype=np.float64)
+    )
+    # np.round는 파이썬 round와 동일하게 half-to-even
+    return pd.DataFrame({
+        "bmr": _nullable_int(np.round(bmr), valid),
+        "tdee": _nullable_int(np.round(bmr*mult), valid),
+        "error": _errors(df, bad),
+    }, index=df.index)
+
+def compute_macros(df: pd.DataFrame) -> pd.DataFrame:
+    """목표별 일일 칼로리와 P/F/C 매크로 (컬럼: weight_kg, tdee, goal). 무효 행은 NA + error."""
+    w, tdee = _numbers(df, "weight_kg"), _numbers(df, "tdee")
+    bad = {"weight_kg": np.isnan(w), "tdee": np.isnan(tdee)}
+    valid = ~np.logical_or.reduce(list(bad.values()))
+
+    adj = _column(df, "goal", "").map(GOAL_ADJ).fillna(DEFAULT_GOAL_ADJ).to_numpy(dtype=np.float64)
+    target = np.trunc(tdee*(1+adj))
+    protein = np.round(w*2.0)
+    fat = np.round(w*0.8)
+    carbs = np.maximum(0, np.floor((target - protein*4 - fat*9)/4))   # 정수 // 4와 동일
+    return pd.DataFrame({
+        "kcal": _nullable_int(target, valid),
+        "protein_g": _nullable_int(protein, valid),
+        "fat_g": _nullable_int(fat, valid),
+        "carbs_g": _nullable_int(carbs, valid),
+        "error": _errors(df, bad),
+    }, index=df.index)
+
+def bulk_plan(profiles: Profiles) -> pd.DataFrame:
+    """프로필 배치 → 입력 컬럼 + bmr, tdee, kcal, protein_g, fat_g, carbs_g, error.
+    잘못된 행은 예외 없이 결과가 NA(Int64)이고 error 컬럼에 누락/무효 컬럼명이 기록됩니다.
+    """
+    df = to_frame(profiles)
+    energy = compute_tdee(df)
+    macros = compute_macros(pd.DataFrame({
+        "weight_kg": df["weight_kg"] if "weight_kg" in df.columns else np.nan,
+        "tdee": energy["tdee"],
+        "goal": _column(df, "goal", ""),
+    }, index=df.index))
+    # 에너지 단계 오류가 원인이므로 우선 표시
+    error = energy["error"].where(energy["error"].notna(), macros["error"])
+    # 이전 결과를 다시 입력한 경우 출력 컬럼이 중복되지 않도록 기존 값은 버리고 새로 계산
+    out = pd.concat([df.drop(columns=list(OUTPUT_COLUMNS), errors="ignore"),
+                     energy.drop(columns="error"), macros.drop(columns="error")], axis=1)
+    out["error"] = error
+    return out
+
+def _row_to_dict(frame: pd.DataFrame) -> Dict[str, int]:
+    row = frame.iloc[0]
+    if row["error"] is not None:
+        raise ValueError(row["error"])
+    return {k: int(v) for k, v in row.drop("error").items()}
+
+def tdee_one(profile: Dict[str, Any]) -> Dict[str, int]:
+    return _row_to_dict(compute_tdee(pd.DataFrame([profile])))
+
+def macros_one(goal: Dict[str, Any]) -> Dict[str, int]:
+    return _row_to_dict(compute_macros(pd.DataFrame([goal])))
+
+def _benchmark(n: int = 20000) -> None:
+    """도구 단건 루프 vs 벡터 일괄 계산 처리량 비교."""
+    import json
+    from .fitness_tools import estimate_tdee, macro_plan
+
+    rng = np.random.default_rng(0)
+    profiles = [{
+        "sex": "M" if rng.random() < 0.5 else "F",
+        "age": int(rng.integers(18, 70)),
+        "height_cm": int(rng.integers(150, 200)),
+        "weight_kg": round(float(rng.uniform(45, 120)), 1),
+        "activity": list(ACTIVITY_MULT)[int(rng.integers(0, 4))],
+        "goal": list(GOAL_ADJ)[int(rng.integers(0, 3))],
+    } for _ in range(n)]
+
+    t0 = time.perf_counter()
+    loop = []
+    for p in profiles:
+        e = estimate_tdee.invoke(json.dumps(p))
+        m = macro_plan.invoke(json.dumps({"weight_kg": p["weight_kg"], "tdee": e["tdee"], "goal": p["goal"]}))
+        loop.append({**e, **m})
+    t_loop = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    out = bulk_plan(profiles)
+    t_bulk = time.perf_counter() - t0
+
+    cols = list(OUTPUT_COLUMNS[:-1])
+    same = bool((pd.DataFrame(loop)[cols].to_numpy() == out[cols].to_numpy(dtype=np.int64)).all())
+    print(f"n={n} loop={t_loop:.2f}s ({n/t_loop:,.0f}/s) bulk={t_bulk:.3f}s ({n/t_bulk:,.0f}/s) "
+          f"speedup={t_loop/t_bulk:,.0f}x identical={same}")
+
+if __name__ == "__main__":
+    # python -m tools.fitness_plan (app/ 에서 실행)
+    _benchmark()
@@ -1,29 +1,21 @@
 from langchain_core.tools import tool
 import json
 
+from .fitness_plan import tdee_one, macros_one
+
 @tool
 def estimate_tdee(profile_json: str):
     """Mifflin–St Jeor 공식을 사용해 BMR과 활동계수로 TDEE를 추정합니다.
     입력은 JSON 문자열(성별/나이/키/체중/활동수준)이어야 합니다.
     """
-    p = json.loads(profile_json)
-    s,a,h,w = p["sex"],p["age"],p["height_cm"],p["weight_kg"]
-    bmr = 10*w + 6.25*h - 5*a + (5 if s.upper().startswith("M") else -161)
-    mult = {"sedentary":1.2,"light":1.375,"moderate":1.55,"high":1.725}.get(p.get("activity","moderate"),1.55)
-    return {"bmr": round(bmr), "tdee": round(bmr*mult)}
+    return tdee_one(json.loads(profile_json))
 
 @tool
 def macro_plan(goal_json: str):
     """TDEE와 목표(감량/유지/증량)에 따라 일일 칼로리와 P/F/C 매크로를 계산합니다.
     입력은 JSON 문자열(체중, TDEE, goal)입니다.
     """
-    g = json.loads(goal_json)
-    w, tdee, goal = g["weight_kg"], g["tdee"], g["goal"]
-    adj = {"cut":-0.2,"recomp":0.0,"bulk":0.1}.get(goal,0.0)
-    target = int(tdee*(1+adj))
-    protein = int(round(w*2.0)); fat = int(round(w*0.8))
-    carbs = max(0, (target - protein*4 - fat*9)//4)
-    return {"kcal":target,"protein_g":protein,"fat_g":fat,"carbs_g":carbs}
+    return macros_one(json.loads(goal_json))
 
 @tool
 def exercise_picker(criteria_json: str):
@@ -1,6 +1,11 @@
 # app/tools/rag_tools.py
 import os
 import json
+import time
+import hashlib
+import threading
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional, Dict, Any, List
 
@@ -20,6 +25,7 @@ RES_DIR = Path(os.getenv("RAG_RESOURCES_DIR", "app/resources")).resolve()
 
 # 내부 상태
 _DB = None                   # FAISS 인스턴스 (로드 후 캐시)
+_DB_LOCK = threading.RLock()
 _SCOPE: Dict[str, Any] = {   # {"mode":"corpus"} or {"mode":"file", "file":"..."}
     "mode": "corpus"
 }
@@ -28,6 +34,18 @@ def _index_exists(vs_dir: str | Path) -> bool:
     p = Path(vs_dir)
     return (p / "index.faiss").exists() and (p / "index.pkl").exists()
 
+def index_version(vs_dir: str | Path = DEFAULT_INDEX) -> str:
+    """인덱스 파일의 크기/수정시각으로 만든 버전 문자열. 재빌드 시 값이 바뀝니다."""
+    p = Path(vs_dir)
+    parts = []
+    for name in ("index.faiss", "index.pkl"):
+        f = p / name
+        if not f.exists():
+            return "none"
+        st = f.stat()
+        parts.append(f"{st.st_size}:{st.st_mtime_ns}")
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()[:12]
+
 def _ensure_corpus_index() -> None:
     """코퍼스 인덱스가 없으면 전체 resources를 스캔해 생성."""
     if _index_exists(DEFAULT_INDEX):
@@ -48,9 +66,10 @@ def _ensure_corpus_index() -> None:
 
 def _load_db():
     global _DB
-    if _DB is None:
-        model_size = "small" if "small" in str(DEFAULT_INDEX) else "large"
-        _DB = load_faiss(persist_dir=str(DEFAULT_INDEX), model_size=model_size)
+    with _DB_LOCK:   # prefetch 스레드와 에이전트가 동시에 로드하지 않도록
+        if _DB is None:
+            model_size = "small" if "small" in str(DEFAULT_INDEX) else "large"
+            _DB = load_faiss(persist_dir=str(DEFAULT_INDEX), model_size=model_size)
     return _DB
 
 def _filter_for_scope() -> Optional[Dict[str, Any]]:
@@ -74,23 +93,14 @@ def set_scope(mode: str = "corpus", file_path: Optional[str] = None) -> None:
         _SCOPE.clear()
         _SCOPE["mode"] = "corpus"
 
-@tool("search_papers", return_direct=False)
-def search_papers(query_json: str) -> str:
-    """운동/영양/보조제 질문에 대해 코퍼스에서 상위 근거를 검색합니다.
-    입력(JSON): {"query":"...", "k":6, "method":"mmr|similarity"}
-    - 단일 코퍼스 인덱스를 사용합니다.
-    - 'set_scope'로 스코프가 'file'이면 해당 파일(source 메타데이터)로 필터링합니다.
-    반환: JSON 문자열 [{"text":..., "source":..., "page":..., "score":...}, ...]
-    """
+def get_scope() -> Dict[str, Any]:
+    """현재 스코프의 복사본."""
+    return dict(_SCOPE)
+
+def _search(q: str, k: int, method: str, flt: Optional[Dict[str, Any]]) -> str:
     _ensure_corpus_index()
     db = _load_db()
 
-    args = json.loads(query_json)
-    q = args.get("query", "")
-    k = int(args.get("k", 6))
-    method = (args.get("method") or "mmr").lower()
-    flt = _filter_for_scope()
-
     try:
         if method == "mmr":
             # 다양성 고려 검색
@@ -111,10 +121,114 @@ def search_papers(query_json: str) -> str:
             "text": d.page_content[:1200],
             "source": d.metadata.get("source"),
             "page": d.metadata.get("page"),
+            **({"rows": d.metadata["rows"]} if d.metadata.get("rows") else {}),
             "score": float(score) if score is not None else None
         })
     return json.dumps(out, ensure_ascii=False)
 
+# --- 추측성 prefetch -----------------------------------------------------------
+# supervisor 라우팅 LLM 호출과 동시에 마지막 사용자 메시지로 검색을 미리 시작하고,
+# 에이전트의 search_papers 호출이 같은 (정규화 질의, k, method, 스코프)면 그 결과를 재사용합니다.
+# 다른 질의에 대한 결과를 대신 돌려주지 않도록 정확히 일치할 때만 재사용하며,
+# 각 prefetch 결과는 한 번만 사용되고 바로 제거됩니다.
+
+PREFETCH_ENABLED = os.getenv("RAG_PREFETCH", "1") != "0"
+PREFETCH_TTL_S = float(os.getenv("RAG_PREFETCH_TTL_S", "120"))
+DEFAULT_K, DEFAULT_METHOD = 6, "mmr"
+
+_PREFETCH_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="rag-prefetch")
+_PREFETCH: Dict[tuple, Dict[str, Any]] = {}   # key → {"future", "t0"}
+_PREFETCH_LOCK = threading.Lock()
+_PREFETCH_STATS = {"issued": 0, "hits": 0, "misses": 0, "wasted": 0, "errors": 0,
+                   "wait_ms": 0.0, "saved_ms": 0.0}
+
+def _norm_query(q: str) -> str:
+    return " ".join(unicodedata.normalize("NFKC", q or "").lower().split())
+
+def _prefetch_key(q: str, k: int, method: str, flt: Optional[Dict[str, Any]]) -> tuple:
+    return (_norm_query(q), k, method, json.dumps(flt, sort_keys=True))
+
+def _expire_prefetch(now: float) -> None:
+    for key in [key for key, e in _PREFETCH.items() if now - e["t0"] > PREFETCH_TTL_S]:
+        _PREFETCH.pop(key)
+        _PREFETCH_STATS["wasted"] += 1
+
+def _timed_search(q: str, k: int, method: str, flt: Optional[Dict[str, Any]]) -> tuple:
+    t0 = time.perf_counter()
+    return _search(q, k, method, flt), time.perf_counter() - t0
+
+def prefetch_search(query: str, k: int = DEFAULT_K, method: str = DEFAULT_METHOD) -> bool:
+    """search_papers와 같은 검색을 백그라운드로 시작. 이미 진행 중인 키면 False."""
+    # 인덱스 빌드처럼 비싼 작업은 추측으로 시작하지 않음
+    if not PREFETCH_ENABLED or not _norm_query(query) or not _index_exists(DEFAULT_INDEX):
+        return False
+    flt = _filter_for_scope()
+    key = _prefetch_key(query, k, method, flt)
+    now = time.perf_counter()
+    with _PREFETCH_LOCK:
+        _expire_prefetch(now)
+        if key in _PREFETCH:
+            return False
+        fut = _PREFETCH_POOL.submit(_timed_search, query, k, method, flt)
+        _PREFETCH[key] = {"future": fut, "t0": now}
+        _PREFETCH_STATS["issued"] += 1
+    return True
+
+def _take_prefetched(key: tuple) -> Optional[str]:
+    """정확히 같은 키의 prefetch 결과를 꺼냄(한 번만 사용). 없거나 실패했으면 None."""
+    with _PREFETCH_LOCK:
+        _expire_prefetch(time.perf_counter())
+        entry = _PREFETCH.pop(key, None)
+    if entry is None:
+        return None
+    t0 = time.perf_counter()
+    try:
+        result, took_s = entry["future"].result()
+    except Exception:
+        with _PREFETCH_LOCK:
+            _PREFETCH_STATS["errors"] += 1
+        return None
+    waited = time.perf_counter() - t0
+    with _PREFETCH_LOCK:
+        _PREFETCH_STATS["hits"] += 1
+        _PREFETCH_STATS["wait_ms"] += waited * 1000
+        _PREFETCH_STATS["saved_ms"] += max(0.0, took_s - waited) * 1000
+    return result
+
+def get_prefetch_metrics() -> Dict[str, Any]:
+    """prefetch 적중/낭비 통계. hit_rate = hits / (hits + misses)."""
+    with _PREFETCH_LOCK:
+        _expire_prefetch(time.perf_counter())
+        stats = dict(_PREFETCH_STATS)
+        stats["pending"] = len(_PREFETCH)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else None
+    stats["wait_ms"] = round(stats["wait_ms"], 1)
+    stats["saved_ms"] = round(stats["saved_ms"], 1)
+    return stats
+
+@tool("search_papers", return_direct=False)
+def search_papers(query_json: str) -> str:
+    """운동/영양/보조제 질문에 대해 코퍼스에서 상위 근거를 검색합니다.
+    입력(JSON): {"query":"...", "k":6, "method":"mmr|similarity"}
+    - 단일 코퍼스 인덱스를 사용합니다.
+    - 'set_scope'로 스코프가 'file'이면 해당 파일(source 메타데이터)로 필터링합니다.
+    반환: JSON 문자열 [{"text":..., "source":..., "page":..., "rows":...(CSV), "score":...}, ...]
+    """
+    args = json.loads(query_json)
+    q = args.get("query", "")
+    k = int(args.get("k", DEFAULT_K))
+    method = (args.get("method") or DEFAULT_METHOD).lower()
+    flt = _filter_for_scope()
+
+    if PREFETCH_ENABLED:
+        cached = _take_prefetched(_prefetch_key(q, k, method, flt))
+        if cached is not None:
+            return cached
+        with _PREFETCH_LOCK:
+            _PREFETCH_STATS["misses"] += 1
+    return _search(q, k, method, flt)
+
 @tool("corpus_info", return_direct=False)
 def corpus_info(_: str = "") -> str:
     """현재 코퍼스/스코프 상태를 반환합니다(디버그용)."""
@@ -123,5 +237,7 @@ def corpus_info(_: str = "") -> str:
         "resources": str(RES_DIR),
         "scope": dict(_SCOPE),
         "index_exists": _index_exists(DEFAULT_INDEX),
+        "index_version": index_version(DEFAULT_INDEX),
+        "prefetch": get_prefetch_metrics(),
     }
     return json.dumps(info, ensure_ascii=False)